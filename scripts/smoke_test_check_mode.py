@@ -7,31 +7,83 @@ Uses the actual CLI interface, not unit test mocks.
 
 import json
 import os
+import selectors
 import subprocess
 import sys
+import time
 from pathlib import Path
 
 SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent
 SRC_DIR = PROJECT_ROOT / "src"
 
-def run_check(input_data: dict) -> dict:
-    """Run context-protector --check with given input."""
-    env = {"PYTHONPATH": str(SRC_DIR)}
-    result = subprocess.run(
-        [sys.executable, "-m", "context_protector", "--check"],
-        input=json.dumps(input_data),
-        capture_output=True,
-        text=True,
-        env={**os.environ, **env},
+# Environment for every spawned process, built once. Nothing in this script
+# modifies os.environ after import.
+_SUBPROC_ENV = {**os.environ, "PYTHONPATH": str(SRC_DIR)}
+
+# Seconds to wait for the worker to answer one request. The first request
+# may load models, so this is generous.
+RESPONSE_TIMEOUT = 120.0
+
+# Long-lived `--check-stream` worker shared by all run_check() calls
+_worker: subprocess.Popen | None = None
+
+
+def start_worker() -> None:
+    """Start the context-protector --check-stream worker."""
+    global _worker
+    _worker = subprocess.Popen(
+        [sys.executable, "-m", "context_protector", "--check-stream"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        env=_SUBPROC_ENV,
         cwd=PROJECT_ROOT,
     )
-    
-    if result.returncode != 0:
-        print(f"STDERR: {result.stderr}")
-        raise RuntimeError(f"Command failed with code {result.returncode}")
-    
-    return json.loads(result.stdout)
+
+
+def stop_worker() -> None:
+    """Close the worker's stdin and wait for it to exit."""
+    global _worker
+    if _worker is None:
+        return
+    _worker.stdin.close()
+    _worker.wait()
+    _worker = None
+
+
+def _read_response_line() -> bytes:
+    """Read one line from the worker, failing if it dies or takes too long."""
+    fd = _worker.stdout.fileno()
+    buf = bytearray()
+    deadline = time.monotonic() + RESPONSE_TIMEOUT
+    with selectors.DefaultSelector() as selector:
+        selector.register(fd, selectors.EVENT_READ)
+        while not buf.endswith(b"\n"):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                _worker.kill()
+                raise TimeoutError(f"Worker did not answer within {RESPONSE_TIMEOUT}s")
+            if not selector.select(min(remaining, 0.5)):
+                if _worker.poll() is not None:
+                    raise RuntimeError(f"Worker exited with code {_worker.returncode}")
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise RuntimeError(f"Worker exited with code {_worker.wait()}")
+            buf += chunk
+    return bytes(buf)
+
+
+def run_check(input_data: dict) -> dict:
+    """Send one request to the --check-stream worker and return its result."""
+    if _worker is None:
+        raise RuntimeError("Worker not started")
+    if _worker.poll() is not None:
+        raise RuntimeError(f"Worker exited with code {_worker.returncode}")
+
+    _worker.stdin.write(json.dumps(input_data).encode() + b"\n")
+    _worker.stdin.flush()
+    return json.loads(_read_response_line())
 
 
 def test_safe_content():
@@ -153,13 +205,13 @@ def test_help_flag():
     result = subprocess.run(
         [sys.executable, "-m", "context_protector", "--help"],
         capture_output=True,
-        text=True,
-        env={**os.environ, "PYTHONPATH": str(SRC_DIR)},
+        env=_SUBPROC_ENV,
         cwd=PROJECT_ROOT,
     )
+    stdout = result.stdout.decode("utf-8", "replace")
     
-    assert "--check" in result.stdout, "--check not in help output"
-    assert "OpenCode" in result.stdout, "OpenCode not mentioned in help"
+    assert "--check" in stdout, "--check not in help output"
+    assert "OpenCode" in stdout, "OpenCode not mentioned in help"
     
     print("PASSED")
 
@@ -171,12 +223,12 @@ def test_version_flag():
     result = subprocess.run(
         [sys.executable, "-m", "context_protector", "--version"],
         capture_output=True,
-        text=True,
-        env={**os.environ, "PYTHONPATH": str(SRC_DIR)},
+        env=_SUBPROC_ENV,
         cwd=PROJECT_ROOT,
     )
+    stdout = result.stdout.decode("utf-8", "replace")
     
-    assert "0.1.0" in result.stdout or "context-protector" in result.stdout
+    assert "0.1.0" in stdout or "context-protector" in stdout
     print("PASSED")
 
 
@@ -202,13 +254,17 @@ def main():
     passed = 0
     failed = 0
     
-    for test in tests:
-        try:
-            test()
-            passed += 1
-        except Exception as e:
-            print(f"FAILED: {e}")
-            failed += 1
+    start_worker()
+    try:
+        for test in tests:
+            try:
+                test()
+                passed += 1
+            except Exception as e:
+                print(f"FAILED: {e}")
+                failed += 1
+    finally:
+        stop_worker()
     
     print()
     print("=" * 60)
@@ -14,16 +14,10 @@ import sys
 from dataclasses import dataclass
 from importlib.metadata import version as get_package_version
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from context_protector.config import (
-    get_config,
-    init_config,
-    load_config,
-    set_config_path,
-    set_enabled,
-)
-from context_protector.hook_handler import HookHandler, process_hook
+if TYPE_CHECKING:
+    from context_protector.hook_handler import HookHandler, process_hook
 
 try:
     __version__ = get_package_version("context-protector")
@@ -33,6 +27,16 @@ except Exception:
 __all__ = ["CheckResult", "HookHandler", "check_content", "main", "process_hook"]
 
 
+def __getattr__(name: str) -> Any:
+    # The hook handler pulls in config and provider machinery, so it is only
+    # imported on first use. This keeps --help and --version fast.
+    if name in ("HookHandler", "process_hook"):
+        from context_protector import hook_handler
+
+        return getattr(hook_handler, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 @dataclass
 class CheckResult:
     """Result from content check operation.
@@ -96,6 +100,40 @@ def check_content(
     return CheckResult(safe=True)
 
 
+def _check_request(input_data_str: str) -> dict[str, Any]:
+    """Process a single --check request.
+
+    Args:
+        input_data_str: Raw JSON request (see _handle_check_command)
+
+    Returns:
+        JSON-serializable result dictionary
+    """
+    if not input_data_str:
+        return {"error": "No input provided", "safe": True, "alert": None}
+
+    try:
+        input_data = json.loads(input_data_str)
+    except json.JSONDecodeError as e:
+        return {"error": f"Invalid JSON: {e}", "safe": True, "alert": None}
+
+    if not isinstance(input_data, dict):
+        return {"error": "Request must be a JSON object", "safe": True, "alert": None}
+
+    content = input_data.get("content", "")
+    content_type = input_data.get("type", "tool_input")
+    tool_name = input_data.get("tool_name")
+
+    if not content:
+        return CheckResult(safe=True).to_dict()
+
+    try:
+        return check_content(content, content_type, tool_name).to_dict()
+    except Exception as e:
+        logging.getLogger(__name__).exception("Error during content check")
+        return {"error": str(e), "safe": True, "alert": None}
+
+
 def _handle_check_command() -> None:
     """Handle --check mode for OpenCode integration.
 
@@ -112,6 +150,8 @@ def _handle_check_command() -> None:
         "alert": { "explanation": "...", "provider": "..." } | null
     }
     """
+    from context_protector.config import load_config
+
     _configure_logging()
 
     config = load_config()
@@ -120,40 +160,43 @@ def _handle_check_command() -> None:
         sys.exit(0)
 
     input_data_str = sys.stdin.read().strip()
-    if not input_data_str:
-        error_result = {"error": "No input provided", "safe": True, "alert": None}
-        print(json.dumps(error_result))
-        sys.exit(0)
+    print(json.dumps(_check_request(input_data_str)))
+    sys.exit(0)
 
-    try:
-        input_data = json.loads(input_data_str)
-    except json.JSONDecodeError as e:
-        error_result = {"error": f"Invalid JSON: {e}", "safe": True, "alert": None}
-        print(json.dumps(error_result))
-        sys.exit(0)
 
-    content = input_data.get("content", "")
-    content_type = input_data.get("type", "tool_input")
-    tool_name = input_data.get("tool_name")
+def _handle_check_stream_command() -> None:
+    """Handle --check-stream mode.
 
-    if not content:
-        result = CheckResult(safe=True)
-        print(json.dumps(result.to_dict()))
-        sys.exit(0)
+    Like --check, but reads one JSON request per line from stdin and writes
+    one JSON result per line to stdout, flushing after each. A single process
+    can serve many checks without paying interpreter and import startup for
+    each one.
+    """
+    from context_protector.config import load_config
 
-    try:
-        result = check_content(content, content_type, tool_name)
-        print(json.dumps(result.to_dict()))
-    except Exception as e:
-        logging.getLogger(__name__).exception("Error during content check")
-        error_result = {"error": str(e), "safe": True, "alert": None}
-        print(json.dumps(error_result))
+    _configure_logging()
+
+    config = load_config()
+    disabled_result: dict[str, Any] = {"safe": True, "alert": None}
+
+    if config.enabled and config.provider == "LlamaFirewall":
+        # Import the model stack, silenced, before stdout carries any results
+        from context_protector.providers.llama_firewall import preload
+
+        preload(config.llama_firewall.scanner_mode)
+
+    for line in sys.stdin:
+        result = _check_request(line.strip()) if config.enabled else disabled_result
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
 
     sys.exit(0)
 
 
 def _configure_logging() -> None:
     """Configure logging based on configuration."""
+    from context_protector.config import get_config
+
     config = get_config()
 
     handlers: list[logging.Handler] = []
@@ -175,6 +218,7 @@ Guardrail-based security for AI coding agents (Claude Code, OpenCode).
 Usage:
   context-protector                     Run as Claude Code hook (reads JSON from stdin)
   context-protector --check             Check content for threats (reads JSON from stdin)
+  context-protector --check-stream      Like --check, one JSON request per line
   context-protector --config <path>     Use custom config file
   context-protector init                Create default config file
   context-protector init --force        Overwrite existing config file
@@ -194,6 +238,8 @@ Environment variables override config file settings (prefix: CONTEXT_PROTECTOR_)
 
 def _handle_init_command() -> None:
     """Handle the init subcommand."""
+    from context_protector.config import get_config_path, init_config
+
     force = "--force" in sys.argv or "-f" in sys.argv
 
     try:
@@ -206,8 +252,6 @@ def _handle_init_command() -> None:
         print()
         print(f"Edit {config_path} to customize.")
     except FileExistsError:
-        from context_protector.config import get_config_path
-
         print(f"Config file already exists: {get_config_path()}")
         print("Use --force to overwrite.")
         sys.exit(1)
@@ -217,6 +261,8 @@ def _parse_config_flag() -> None:
     """Parse --config flag and set custom config path."""
     for i, arg in enumerate(sys.argv):
         if arg == "--config" and i + 1 < len(sys.argv):
+            from context_protector.config import set_config_path
+
             config_path = Path(sys.argv[i + 1])
             set_config_path(config_path)
             # Remove --config and its argument from sys.argv
@@ -236,11 +282,17 @@ def main() -> None:
             _handle_check_command()
             return
 
+        if command == "--check-stream":
+            _handle_check_stream_command()
+            return
+
         if command == "init":
             _handle_init_command()
             return
 
         if command == "--disable":
+            from context_protector.config import set_enabled
+
             config_path = set_enabled(False)
             print("Context Protector disabled.")
             print(f"Config: {config_path}")
@@ -248,6 +300,8 @@ def main() -> None:
             return
 
         if command == "--enable":
+            from context_protector.config import set_enabled
+
             config_path = set_enabled(True)
             print("Context Protector enabled.")
             print(f"Config: {config_path}")
@@ -261,5 +315,7 @@ def main() -> None:
             print(f"context-protector {__version__}")
             return
 
+    from context_protector.hook_handler import process_hook
+
     _configure_logging()
     process_hook()
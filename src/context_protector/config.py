@@ -4,14 +4,20 @@ Provides YAML-based configuration with environment variable overrides.
 Config file location: ~/.config/context-protector/config.yaml
 """
 
+import contextlib
+import copy
 import logging
 import os
-from dataclasses import asdict, dataclass, field
+import re
+import stat
+import tempfile
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field, fields
+from functools import cache, lru_cache
 from pathlib import Path
 from typing import Any
 
-import yaml
-
 logger = logging.getLogger(__name__)
 
 # Default config file template with comments
@@ -45,6 +51,11 @@ llama_firewall:
   #   (uses deprecated HuggingFace API). Use basic mode until Meta releases a fix.
   scanner_mode: basic
 
+  # Run one throwaway scan when the firewall is built so the first real check
+  # doesn't pay for model loading. Only worth it for long-lived processes
+  # (e.g. --check-stream); a single hook invocation just does the work twice.
+  warmup: false
+
 # NeMo Guardrails provider settings
 nemo_guardrails:
   # Detection mode: heuristics, injection, self_check, local, or all
@@ -67,15 +78,22 @@ gcp_model_armor:
   template_id: null     # Model Armor template ID
 """
 
+# Template encoded once so save_default_config() is a single binary write
+_DEFAULT_CONFIG_BYTES = DEFAULT_CONFIG_TEMPLATE.encode("utf-8")
+
+# Matches the top-level 'enabled:' line rewritten by set_enabled()
+_ENABLED_RE = re.compile(r"^enabled:\s*(true|false)", re.MULTILINE)
+
 
-@dataclass
+@dataclass(slots=True)
 class LlamaFirewallConfig:
     """LlamaFirewall provider configuration."""
 
     scanner_mode: str = "basic"
+    warmup: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class NeMoGuardrailsConfig:
     """NeMo Guardrails provider configuration."""
 
@@ -84,7 +102,7 @@ class NeMoGuardrailsConfig:
     ollama_base_url: str = "http://localhost:11434"
 
 
-@dataclass
+@dataclass(slots=True)
 class GCPModelArmorConfig:
     """GCP Model Armor provider configuration."""
 
@@ -93,7 +111,7 @@ class GCPModelArmorConfig:
     template_id: str | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Config:
     """Complete configuration."""
 
@@ -121,6 +139,22 @@ def set_config_path(path: Path | None) -> None:
     _config_path_override = path
 
 
+@lru_cache(maxsize=8)
+def _compute_config_path(config_env: str | None, xdg_config: str | None, home: str | None) -> Path:
+    """Resolve the config file path from the environment values it depends on.
+
+    Cached on those values, so a changed environment is picked up without a
+    reset. reset_config() clears the cache.
+    """
+    if config_env:
+        return Path(config_env)
+
+    if not xdg_config:
+        home_dir = Path(home) if home else Path.home()
+        return home_dir / ".config" / "context-protector" / "config.yaml"
+    return Path(xdg_config) / "context-protector" / "config.yaml"
+
+
 def get_config_path() -> Path:
     """Get the config file path.
 
@@ -133,101 +167,323 @@ def get_config_path() -> Path:
     if _config_path_override is not None:
         return _config_path_override
 
-    # Check environment variable for config path
-    if config_env := os.environ.get("CONTEXT_PROTECTOR_CONFIG"):
-        return Path(config_env)
+    env = os.environ
+    return _compute_config_path(
+        env.get("CONTEXT_PROTECTOR_CONFIG"), env.get("XDG_CONFIG_HOME"), env.get("HOME")
+    )
 
-    xdg_config = os.environ.get("XDG_CONFIG_HOME")
-    base = Path(xdg_config) if xdg_config else Path.home() / ".config"
-    return base / "context-protector" / "config.yaml"
+
+@cache
+def _field_names(cls: type) -> frozenset[str]:
+    """Get the field names of a dataclass type (computed once per type)."""
+    return frozenset(f.name for f in fields(cls))
 
 
 def _merge_dict_into_dataclass(dc: Any, data: dict[str, Any]) -> None:
     """Merge dictionary values into a dataclass instance.
 
+    Unknown keys and None values are ignored.
+
     Args:
         dc: Dataclass instance to update
         data: Dictionary with values to merge
     """
+    cls: type = type(dc)
+    names = _field_names(cls)
     for key, value in data.items():
-        if hasattr(dc, key) and value is not None:
+        if value is not None and key in names:
             setattr(dc, key, value)
 
 
-def _load_config_from_file(config_path: Path) -> dict[str, Any]:
-    """Load configuration from YAML file.
+class _FastParseBail(Exception):
+    """Raised when _fast_parse_config meets YAML outside the subset it handles."""
+
+
+# Plain scalars resolved the same way PyYAML's SafeLoader resolves them
+_YAML_BOOLS = {
+    **dict.fromkeys(("true", "True", "TRUE", "yes", "Yes", "YES", "on", "On", "ON"), True),
+    **dict.fromkeys(("false", "False", "FALSE", "no", "No", "NO", "off", "Off", "OFF"), False),
+}
+_YAML_NULLS = frozenset(("", "~", "null", "Null", "NULL"))
+
+_FAST_KEY_RE = re.compile(r"([A-Za-z_][A-Za-z0-9_]*):(?:[ \t]+(.*))?")
+_FAST_INT_RE = re.compile(r"[-+]?(?:0|[1-9][0-9]*)")
+_FAST_QUOTED_RE = re.compile(r"""(?:"([^"\\]*)"|'([^']*)')(?:[ \t]+#.*)?""")
+
+
+def _fast_parse_scalar(text: str) -> Any:
+    """Parse a scalar value for _fast_parse_config.
+
+    Raises:
+        _FastParseBail: If the value needs the full YAML parser
+    """
+    if text[:1] in ("'", '"'):
+        match = _FAST_QUOTED_RE.fullmatch(text)
+        if match is None:
+            raise _FastParseBail
+        double, single = match.groups()
+        return double if double is not None else single
+
+    value, _, _ = text.partition(" #")
+    value = value.rstrip()
+    if value in _YAML_NULLS:
+        return None
+    if value in _YAML_BOOLS:
+        return _YAML_BOOLS[value]
+    if _FAST_INT_RE.fullmatch(value):
+        return int(value)
+    # Numbers, timestamps, flow collections, anchors, tags, block scalars...
+    if (
+        value[0] in "0123456789+-.[]{}&*!|<>%@`#,?:="
+        or ": " in value
+        or "\t" in value
+        or value.endswith(":")
+    ):
+        raise _FastParseBail
+    return value
+
+
+def _fast_parse_config(text: str) -> dict[str, Any]:
+    """Parse the subset of YAML used by config files without PyYAML.
+
+    Handles top-level ``key: scalar`` lines and sections holding one level of
+    indented ``key: scalar`` lines, with comments and blank lines.
 
     Args:
-        config_path: Path to the config file
+        text: Config file contents
 
     Returns:
-        Dictionary with configuration data, empty dict if file doesn't exist
+        Parsed configuration data
+
+    Raises:
+        _FastParseBail: If the text uses anything outside that subset
     """
-    if not config_path.exists():
-        return {}
+    data: dict[str, Any] = {}
+    section: dict[str, Any] | None = None
+    section_key: str | None = None
+    section_indent = 0
+
+    for raw_line in text.splitlines():
+        line = raw_line.rstrip()
+        stripped = line.lstrip(" ")
+        if not stripped or stripped.startswith("#"):
+            continue
+
+        indent = len(line) - len(stripped)
+        match = _FAST_KEY_RE.fullmatch(stripped)
+        if match is None:
+            raise _FastParseBail
+        key, raw_value = match.groups()
+        if key in _YAML_BOOLS or key in _YAML_NULLS:
+            raise _FastParseBail
+
+        if indent == 0:
+            section = None
+            if raw_value is None or raw_value.startswith("#"):
+                # Null for now; becomes a mapping if indented lines follow
+                data[key] = None
+                section_key = key
+                section_indent = 0
+            else:
+                data[key] = _fast_parse_scalar(raw_value)
+                section_key = None
+            continue
+
+        if section_key is None:
+            raise _FastParseBail
+        if section is None:
+            section = {}
+            section_indent = indent
+            data[section_key] = section
+        if indent != section_indent or raw_value is None or raw_value.startswith("#"):
+            raise _FastParseBail
+        section[key] = _fast_parse_scalar(raw_value)
+
+    return data
+
+
+@cache
+def _yaml_safe_loader() -> Any:
+    """Get PyYAML's libyaml-backed CSafeLoader, or SafeLoader without libyaml."""
+    import yaml
+
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+@cache
+def _yaml_safe_dumper() -> Any:
+    """Get PyYAML's libyaml-backed CSafeDumper, or SafeDumper without libyaml."""
+    import yaml
+
+    return getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+# Parsed config files keyed by absolute path. Entries are reused while the
+# file's (mtime_ns, size, inode) is unchanged; reset_config() clears them.
+_FILE_CACHE_SIZE = 100
+_file_cache: OrderedDict[str, tuple[tuple[int, int, int], dict[str, Any]]] = OrderedDict()
 
+
+def _clear_file_cache() -> None:
+    """Drop all cached config file contents."""
+    _file_cache.clear()
+
+
+def _read_config_file(config_path: Path) -> dict[str, Any] | None:
+    """Read and parse a config file.
+
+    Args:
+        config_path: Path to the config file
+
+    Returns:
+        Dictionary with configuration data (empty if the YAML is invalid or
+        not a mapping), or None if the file could not be read
+    """
     try:
-        with open(config_path) as f:
-            data = yaml.safe_load(f)
-            return data if isinstance(data, dict) else {}
-    except yaml.YAMLError as e:
-        logger.warning("Invalid YAML in config file %s: %s", config_path, e)
-        return {}
+        raw = config_path.read_bytes()
     except OSError as e:
         logger.warning("Error reading config file %s: %s", config_path, e)
-        return {}
+        return None
 
+    return _parse_yaml_bytes(raw, config_path)
 
-def _apply_env_overrides(config: Config) -> Config:
-    """Apply environment variable overrides to configuration.
 
-    Environment variables take precedence over config file values.
+def _parse_yaml_bytes(raw: bytes, source: str | Path = "<bytes>") -> dict[str, Any]:
+    """Parse raw config file contents.
+
+    Plain config files are parsed by _fast_parse_config; PyYAML is only
+    imported for contents using YAML features outside that subset.
 
     Args:
-        config: Configuration to update
+        raw: Config file contents
+        source: Where the contents came from, for log messages
 
     Returns:
-        Updated configuration
+        Dictionary with configuration data, empty if the YAML is invalid or
+        not a mapping
     """
-    # Top-level settings
-    if enabled := os.environ.get("CONTEXT_PROTECTOR_ENABLED"):
-        config.enabled = enabled.lower() in ("true", "1", "yes")
+    try:
+        return _fast_parse_config(raw.decode("utf-8"))
+    except (UnicodeDecodeError, _FastParseBail):
+        pass
 
-    if provider := os.environ.get("CONTEXT_PROTECTOR_PROVIDER"):
-        config.provider = provider
+    # Deferred so that plain config files never pay for PyYAML
+    import yaml
 
-    if response_mode := os.environ.get("CONTEXT_PROTECTOR_RESPONSE_MODE"):
-        config.response_mode = response_mode.lower()
+    try:
+        # PyYAML detects the encoding (UTF-8/UTF-16, BOM) from bytes itself
+        data = yaml.load(raw, Loader=_yaml_safe_loader())
+    except yaml.YAMLError as e:
+        logger.warning("Invalid YAML in config file %s: %s", source, e)
+        return {}
+    return data if isinstance(data, dict) else {}
 
-    if log_level := os.environ.get("CONTEXT_PROTECTOR_LOG_LEVEL"):
-        config.log_level = log_level.upper()
 
-    if log_file := os.environ.get("CONTEXT_PROTECTOR_LOG_FILE"):
-        config.log_file = log_file
+def _load_config_from_file(config_path: Path) -> dict[str, Any]:
+    """Load configuration from YAML file.
 
-    # LlamaFirewall settings
-    if scanner_mode := os.environ.get("CONTEXT_PROTECTOR_SCANNER_MODE"):
-        config.llama_firewall.scanner_mode = scanner_mode.lower()
+    Parsed files are cached and only re-read when their modification time,
+    size or inode changes. Callers get their own copy of the data.
 
-    # NeMo Guardrails settings
-    if nemo_mode := os.environ.get("CONTEXT_PROTECTOR_NEMO_MODE"):
-        config.nemo_guardrails.mode = nemo_mode.lower()
+    Args:
+        config_path: Path to the config file
 
-    if ollama_model := os.environ.get("CONTEXT_PROTECTOR_OLLAMA_MODEL"):
-        config.nemo_guardrails.ollama_model = ollama_model
+    Returns:
+        Dictionary with configuration data, empty dict if file doesn't exist
+    """
+    try:
+        st = config_path.stat()
+    except OSError:
+        return {}
+
+    key = os.path.abspath(config_path)
+    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+    cached = _file_cache.get(key)
+    if cached is not None and cached[0] == signature:
+        _file_cache.move_to_end(key)
+        return copy.deepcopy(cached[1])
+
+    data = _read_config_file(config_path)
+    if data is None:
+        return {}
+
+    _file_cache[key] = (signature, data)
+    _file_cache.move_to_end(key)
+    if len(_file_cache) > _FILE_CACHE_SIZE:
+        _file_cache.popitem(last=False)
+    return copy.deepcopy(data)
 
-    if ollama_base_url := os.environ.get("CONTEXT_PROTECTOR_OLLAMA_BASE_URL"):
-        config.nemo_guardrails.ollama_base_url = ollama_base_url
 
+# Environment variable overrides: (variable name, setter applied to the config)
+_ENV_MAP: tuple[tuple[str, Callable[[Config, str], None]], ...] = (
+    # Top-level settings
+    (
+        "CONTEXT_PROTECTOR_ENABLED",
+        lambda c, v: setattr(c, "enabled", v.lower() in ("true", "1", "yes")),
+    ),
+    ("CONTEXT_PROTECTOR_PROVIDER", lambda c, v: setattr(c, "provider", v)),
+    ("CONTEXT_PROTECTOR_RESPONSE_MODE", lambda c, v: setattr(c, "response_mode", v.lower())),
+    ("CONTEXT_PROTECTOR_LOG_LEVEL", lambda c, v: setattr(c, "log_level", v.upper())),
+    ("CONTEXT_PROTECTOR_LOG_FILE", lambda c, v: setattr(c, "log_file", v)),
+    # LlamaFirewall settings
+    (
+        "CONTEXT_PROTECTOR_SCANNER_MODE",
+        lambda c, v: setattr(c.llama_firewall, "scanner_mode", v.lower()),
+    ),
+    (
+        "CONTEXT_PROTECTOR_LLAMA_WARMUP",
+        lambda c, v: setattr(c.llama_firewall, "warmup", v.lower() in ("true", "1", "yes")),
+    ),
+    # NeMo Guardrails settings
+    ("CONTEXT_PROTECTOR_NEMO_MODE", lambda c, v: setattr(c.nemo_guardrails, "mode", v.lower())),
+    (
+        "CONTEXT_PROTECTOR_OLLAMA_MODEL",
+        lambda c, v: setattr(c.nemo_guardrails, "ollama_model", v),
+    ),
+    (
+        "CONTEXT_PROTECTOR_OLLAMA_BASE_URL",
+        lambda c, v: setattr(c.nemo_guardrails, "ollama_base_url", v),
+    ),
     # GCP Model Armor settings
-    if gcp_project_id := os.environ.get("CONTEXT_PROTECTOR_GCP_PROJECT_ID"):
-        config.gcp_model_armor.project_id = gcp_project_id
+    (
+        "CONTEXT_PROTECTOR_GCP_PROJECT_ID",
+        lambda c, v: setattr(c.gcp_model_armor, "project_id", v),
+    ),
+    ("CONTEXT_PROTECTOR_GCP_LOCATION", lambda c, v: setattr(c.gcp_model_armor, "location", v)),
+    (
+        "CONTEXT_PROTECTOR_GCP_TEMPLATE_ID",
+        lambda c, v: setattr(c.gcp_model_armor, "template_id", v),
+    ),
+)
+
+
+def _env_values() -> tuple[str | None, ...]:
+    """Get the value of each _ENV_MAP variable, in table order (None if unset)."""
+    environ = os.environ
+    return tuple(environ.get(key) for key, _ in _ENV_MAP)
+
+
+def _apply_env_overrides(
+    config: Config, env_values: tuple[str | None, ...] | None = None
+) -> Config:
+    """Apply environment variable overrides to configuration.
+
+    Environment variables take precedence over config file values.
+    Empty values are ignored.
+
+    Args:
+        config: Configuration to update
+        env_values: Values from _env_values(), read from os.environ if None
 
-    if gcp_location := os.environ.get("CONTEXT_PROTECTOR_GCP_LOCATION"):
-        config.gcp_model_armor.location = gcp_location
+    Returns:
+        Updated configuration
+    """
+    if env_values is None:
+        env_values = _env_values()
 
-    if gcp_template_id := os.environ.get("CONTEXT_PROTECTOR_GCP_TEMPLATE_ID"):
-        config.gcp_model_armor.template_id = gcp_template_id
+    for (_, setter), value in zip(_ENV_MAP, env_values, strict=True):
+        if value:
+            setter(config, value)
 
     return config
 
@@ -237,13 +493,35 @@ def load_config() -> Config:
 
     Priority: Environment variables > Config file > Defaults
 
+    When there is neither a config file nor any override in the environment,
+    a fresh default Config is returned. Otherwise a copy of the last
+    result is returned for as long as the _ENV_MAP variables, the config path
+    and the file's stat signature stay the same.
+
     Returns:
         Complete configuration
     """
+    global _loaded_config
+
+    config_path = get_config_path()
+    env_values = _env_values()
+
+    # Fast path: nothing to load or override
+    if all(value is None for value in env_values) and not config_path.exists():
+        return Config()
+
+    try:
+        st = config_path.stat()
+        file_signature: tuple[int, int, int] | None = (st.st_mtime_ns, st.st_size, st.st_ino)
+    except OSError:
+        file_signature = None
+    inputs = (env_values, os.path.abspath(config_path), file_signature)
+    if _loaded_config is not None and _loaded_config[0] == inputs:
+        return copy.deepcopy(_loaded_config[1])
+
     config = Config()
 
     # Load from file if exists
-    config_path = get_config_path()
     file_data = _load_config_from_file(config_path)
 
     if file_data:
@@ -274,8 +552,9 @@ def load_config() -> Config:
             _merge_dict_into_dataclass(config.gcp_model_armor, file_data["gcp_model_armor"])
 
     # Apply environment variable overrides
-    config = _apply_env_overrides(config)
+    config = _apply_env_overrides(config, env_values)
 
+    _loaded_config = (inputs, copy.deepcopy(config))
     return config
 
 
@@ -286,17 +565,42 @@ def save_config(config: Config, path: Path | None = None) -> None:
         config: Configuration to save
         path: Path to save to (defaults to standard config path)
     """
+    import yaml
+
     path = path or get_config_path()
     path.parent.mkdir(parents=True, exist_ok=True)
 
-    with open(path, "w") as f:
-        yaml.dump(
-            asdict(config),
-            f,
-            default_flow_style=False,
-            sort_keys=False,
-            allow_unicode=True,
-        )
+    data = {
+        "enabled": config.enabled,
+        "provider": config.provider,
+        "response_mode": config.response_mode,
+        "log_level": config.log_level,
+        "log_file": config.log_file,
+        "llama_firewall": {
+            "scanner_mode": config.llama_firewall.scanner_mode,
+            "warmup": config.llama_firewall.warmup,
+        },
+        "nemo_guardrails": {
+            "mode": config.nemo_guardrails.mode,
+            "ollama_model": config.nemo_guardrails.ollama_model,
+            "ollama_base_url": config.nemo_guardrails.ollama_base_url,
+        },
+        "gcp_model_armor": {
+            "project_id": config.gcp_model_armor.project_id,
+            "location": config.gcp_model_armor.location,
+            "template_id": config.gcp_model_armor.template_id,
+        },
+    }
+
+    # Serialize first so the file is written in one go
+    text = yaml.dump(
+        data,
+        Dumper=_yaml_safe_dumper(),
+        default_flow_style=False,
+        sort_keys=False,
+        allow_unicode=True,
+    )
+    path.write_text(text, encoding="utf-8")
 
 
 def save_default_config(path: Path | None = None) -> None:
@@ -309,9 +613,7 @@ def save_default_config(path: Path | None = None) -> None:
     """
     path = path or get_config_path()
     path.parent.mkdir(parents=True, exist_ok=True)
-
-    with open(path, "w") as f:
-        f.write(DEFAULT_CONFIG_TEMPLATE)
+    path.write_bytes(_DEFAULT_CONFIG_BYTES)
 
 
 def init_config(force: bool = False) -> Path:
@@ -336,6 +638,40 @@ def init_config(force: bool = False) -> Path:
     return config_path
 
 
+def _replace_file(path: Path, data: bytes) -> None:
+    """Write data to a temporary file next to path and move it into place.
+
+    The replacement gets a new inode, so the file cache signature changes even
+    when the size stays the same and the mtime is within the clock granularity.
+    Symlinks are followed so the link itself survives, and the file's mode and
+    (where permitted) owner are kept. A file with other hard links is written
+    in place instead, since replacing it would detach them.
+
+    Args:
+        path: File to replace
+        data: New contents
+    """
+    target = path.resolve()
+    st = target.stat()
+    if st.st_nlink > 1:
+        target.write_bytes(data)
+        return
+
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_name, stat.S_IMODE(st.st_mode))
+        if hasattr(os, "chown"):
+            with contextlib.suppress(OSError):
+                os.chown(tmp_name, st.st_uid, st.st_gid)
+        os.replace(tmp_name, target)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_name)
+        raise
+
+
 def set_enabled(enabled: bool) -> Path:
     """Enable or disable context-protector.
 
@@ -348,27 +684,20 @@ def set_enabled(enabled: bool) -> Path:
     Returns:
         Path to config file
     """
-    import re
-
     config_path = get_config_path()
 
     if not config_path.exists():
         save_default_config(config_path)
 
-    content = config_path.read_text()
-    enabled_str = "true" if enabled else "false"
+    content = config_path.read_text(encoding="utf-8")
+    enabled_line = f"enabled: {'true' if enabled else 'false'}"
 
-    if re.search(r"^enabled:\s*(true|false)", content, re.MULTILINE):
-        content = re.sub(
-            r"^enabled:\s*(true|false)",
-            f"enabled: {enabled_str}",
-            content,
-            flags=re.MULTILINE,
-        )
+    if _ENABLED_RE.search(content):
+        content = _ENABLED_RE.sub(enabled_line, content)
     else:
-        content = f"enabled: {enabled_str}\n\n" + content
+        content = f"{enabled_line}\n\n" + content
 
-    config_path.write_text(content)
+    _replace_file(config_path, content.encode("utf-8"))
     reset_config()
 
     return config_path
@@ -377,6 +706,9 @@ def set_enabled(enabled: bool) -> Path:
 # Global config instance (loaded lazily)
 _config: Config | None = None
 
+# Last config built by load_config() and the inputs it was built from
+_loaded_config: tuple[tuple[Any, ...], Config] | None = None
+
 
 def get_config() -> Config:
     """Get the global configuration instance.
@@ -398,5 +730,8 @@ def reset_config() -> None:
     Forces reload on next get_config() call.
     Useful for testing.
     """
-    global _config
+    global _config, _loaded_config
     _config = None
+    _loaded_config = None
+    _compute_config_path.cache_clear()
+    _clear_file_cache()
@@ -1,5 +1,20 @@
 """Guardrail providers package."""
 
+from typing import TYPE_CHECKING, Any
+
 from context_protector.providers.base import GuardrailProvider
 
-__all__ = ["GuardrailProvider"]
+if TYPE_CHECKING:
+    from context_protector.providers.llama_firewall import LlamaFirewallProvider
+
+__all__ = ["GuardrailProvider", "LlamaFirewallProvider"]
+
+
+def __getattr__(name: str) -> Any:
+    # llama_firewall sets HF/Torch environment defaults and warning filters at
+    # import time, so only load it when the provider is actually requested.
+    if name == "LlamaFirewallProvider":
+        from context_protector.providers.llama_firewall import LlamaFirewallProvider
+
+        return LlamaFirewallProvider
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -6,6 +6,8 @@ Uses ServiceNow's AprielGuard model to detect safety risks and adversarial attac
 import logging
 import os
 import re
+import sys
+from functools import lru_cache
 from typing import Any
 
 from context_protector.guardrail_types import ContentToCheck, GuardrailAlert
@@ -33,6 +35,27 @@ SAFETY_CATEGORIES = {
     "O16": "Property Rights Violation",
 }
 
+# Pre-built "Ox: Name" labels shared by every format_categories() result
+_CATEGORY_LABELS = {code: sys.intern(f"{code}: {name}") for code, name in SAFETY_CATEGORIES.items()}
+
+# parse_output() patterns
+# Standard format: "unsafe-O14,O12\nnon_adversarial" or "safe\nnon_adversarial"
+_STANDARD_RE = re.compile(
+    r"(safe|unsafe)-?([\w,]*)\s*\n\s*(adversarial|non_adversarial)", re.IGNORECASE
+)
+_SAFETY_REASONING_RE = re.compile(
+    r"safety_risks_assessment_reasoning:(.*?),\s*safety_risks_class:", re.DOTALL | re.IGNORECASE
+)
+_ADV_REASONING_RE = re.compile(
+    r"adversarial_attacks_assessment_reasoning:(.*?),\s*adversarial_attacks_class:",
+    re.DOTALL | re.IGNORECASE,
+)
+_SAFETY_CLASS_RE = re.compile(r"safety_risks_class:\s*(safe|unsafe)", re.IGNORECASE)
+_ADV_CLASS_RE = re.compile(
+    r"adversarial_attacks_class:\s*(adversarial|non_adversarial)", re.IGNORECASE
+)
+_CATEGORIES_RE = re.compile(r"safety_risks_categories:\s*\[(.*?)\]", re.IGNORECASE)
+
 
 def parse_output(text: str, reasoning: bool = False) -> dict[str, Any]:
     """Parse AprielGuard model output.
@@ -54,12 +77,7 @@ def parse_output(text: str, reasoning: bool = False) -> dict[str, Any]:
     }
 
     if not reasoning:
-        # Standard format: "unsafe-O14,O12\nnon_adversarial" or "safe\nnon_adversarial"
-        match = re.match(
-            r"(safe|unsafe)-?([\w,]*)\s*\n\s*(adversarial|non_adversarial)",
-            text,
-            re.IGNORECASE,
-        )
+        match = _STANDARD_RE.match(text)
         if match:
             result["safety_risks_prediction"] = match.group(1).lower()
             categories_str = match.group(2)
@@ -71,28 +89,16 @@ def parse_output(text: str, reasoning: bool = False) -> dict[str, Any]:
         return result
 
     # Reasoning format parsing
-    safety_reasoning = re.search(
-        r"safety_risks_assessment_reasoning:(.*?),\s*safety_risks_class:",
-        text,
-        re.DOTALL | re.IGNORECASE,
-    )
-    adv_reasoning = re.search(
-        r"adversarial_attacks_assessment_reasoning:(.*?),\s*adversarial_attacks_class:",
-        text,
-        re.DOTALL | re.IGNORECASE,
-    )
+    safety_reasoning = _SAFETY_REASONING_RE.search(text)
+    adv_reasoning = _ADV_REASONING_RE.search(text)
 
     if safety_reasoning:
         result["safety_risks_reasoning"] = safety_reasoning.group(1).strip()
     if adv_reasoning:
         result["adversarial_attacks_reasoning"] = adv_reasoning.group(1).strip()
 
-    s_class = re.search(r"safety_risks_class:\s*(safe|unsafe)", text, re.IGNORECASE)
-    a_class = re.search(
-        r"adversarial_attacks_class:\s*(adversarial|non_adversarial)",
-        text,
-        re.IGNORECASE,
-    )
+    s_class = _SAFETY_CLASS_RE.search(text)
+    a_class = _ADV_CLASS_RE.search(text)
 
     if s_class:
         result["safety_risks_prediction"] = s_class.group(1).lower()
@@ -100,7 +106,7 @@ def parse_output(text: str, reasoning: bool = False) -> dict[str, Any]:
         result["adversarial_attacks_prediction"] = a_class.group(1).lower()
 
     # Extract categories if present
-    categories_match = re.search(r"safety_risks_categories:\s*\[(.*?)\]", text, re.IGNORECASE)
+    categories_match = _CATEGORIES_RE.search(text)
     if categories_match:
         categories_str = categories_match.group(1)
         result["safety_risks_categories"] = [
@@ -122,15 +128,13 @@ def format_categories(categories: list[str]) -> str:
     if not categories:
         return ""
 
-    descriptions = []
-    for code in categories:
-        code_upper = code.upper()
-        if code_upper in SAFETY_CATEGORIES:
-            descriptions.append(f"{code_upper}: {SAFETY_CATEGORIES[code_upper]}")
-        else:
-            descriptions.append(code_upper)
+    return _format_category_codes(tuple(code.upper() for code in categories))
+
 
-    return ", ".join(descriptions)
+@lru_cache(maxsize=256)
+def _format_category_codes(codes: tuple[str, ...]) -> str:
+    # Models emit the same few category combinations over and over
+    return ", ".join(_CATEGORY_LABELS.get(code, code) for code in codes)
 
 
 class AprielGuardProvider(GuardrailProvider):
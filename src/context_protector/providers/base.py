@@ -12,6 +12,9 @@ class GuardrailProvider(ABC):
     such as prompt injection attacks.
     """
 
+    # Empty so subclasses that declare __slots__ don't get a __dict__ anyway
+    __slots__ = ()
+
     @property
     @abstractmethod
     def name(self) -> str:
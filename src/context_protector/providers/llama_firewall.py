@@ -6,10 +6,14 @@ Uses Meta's LlamaFirewall to detect prompt injection and other threats.
 from __future__ import annotations
 
 import contextlib
-import io
+import hashlib
 import logging
 import os
+import sys
+import threading
 import warnings
+from collections import OrderedDict
+from collections.abc import Iterator
 from typing import Any
 
 from context_protector.guardrail_types import ContentToCheck, GuardrailAlert
@@ -17,22 +21,189 @@ from context_protector.providers.base import GuardrailProvider
 
 logger = logging.getLogger(__name__)
 
-# Suppress warnings before importing HuggingFace-dependent libraries
-warnings.filterwarnings("ignore", message=".*incorrect regex pattern.*")
-warnings.filterwarnings("ignore", message=".*HfFolder.*")
-warnings.filterwarnings("ignore", category=DeprecationWarning)
-os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
-os.environ.setdefault("TRANSFORMERS_VERBOSITY", "error")
-logging.getLogger("transformers").setLevel(logging.ERROR)
-logging.getLogger("huggingface_hub").setLevel(logging.ERROR)
+# Environment defaults for the HuggingFace/Torch stack. These are only read when
+# those libraries are first imported, so they must be set before that happens.
+_ENV_DEFAULTS = (
+    ("TOKENIZERS_PARALLELISM", "false"),
+    ("TRANSFORMERS_VERBOSITY", "error"),
+    # CPU-only inference: skip oneDNN/XLA setup and torch.compile/dynamo
+    ("TF_ENABLE_ONEDNN_OPTS", "0"),
+    ("TF_CPP_MIN_LOG_LEVEL", "3"),
+    ("TORCH_COMPILE_DISABLE", "1"),
+    ("TORCHDYNAMO_DISABLE", "1"),
+    ("OMP_NUM_THREADS", "1"),
+    # Load safetensors shards concurrently when Prompt Guard is first built
+    ("HF_ENABLE_PARALLEL_LOADING", "true"),
+)
+
+# (message regex, category) pairs ignored for the whole process
+_WARNING_FILTERS: tuple[tuple[str, type[Warning]], ...] = (
+    (".*incorrect regex pattern.*", Warning),
+    (".*HfFolder.*", Warning),
+    ("", DeprecationWarning),
+)
+
+
+def _apply_env_once() -> None:
+    """Set env defaults and warning filters before any HF-dependent import.
+
+    Uses setdefault so values already set by the user are left alone.
+    """
+    for key, value in _ENV_DEFAULTS:
+        os.environ.setdefault(key, value)
+
+    for message, category in _WARNING_FILTERS:
+        warnings.filterwarnings("ignore", message=message, category=category)
+    logging.getLogger("transformers").setLevel(logging.ERROR)
+    logging.getLogger("huggingface_hub").setLevel(logging.ERROR)
+
+
+_apply_env_once()
+
+# Plain ASCII alphanumeric tool inputs shorter than this are never scanned
+_TRIVIAL_INPUT_MAX_LEN = 8
+
+# Number of scan results kept per process, keyed by content digest, type and scanner set
+_RESULT_CACHE_SIZE = 1024
+
+# Interned content types, so alerts and cache keys built from parsed --check
+# requests share one string instead of a fresh copy per call
+_CONTENT_TYPES = {ct: sys.intern(ct) for ct in ("tool_input", "tool_output")}
+
+_SETUP_URL = "https://github.com/meta-llama/PurpleLlama/tree/main/LlamaFirewall#manual-setup"
+_IMPORT_SETUP_ERROR = (
+    "LlamaFirewall requires manual model setup. "
+    "The Prompt Guard model must be downloaded before use. "
+    f"See: {_SETUP_URL} - "
+    "Or switch to NeMoGuardrails: CONTEXT_PROTECTOR_PROVIDER=NeMoGuardrails"
+)
+_AUTH_EXPLANATION = (
+    "LlamaFirewall PROMPT_GUARD requires authentication. "
+    "Set CONTEXT_PROTECTOR_SCANNER_MODE=basic to use without auth."
+)
+_SETUP_EXPLANATION = (
+    "LlamaFirewall requires manual model setup. "
+    f"See: {_SETUP_URL} - "
+    "Or set CONTEXT_PROTECTOR_SCANNER_MODE=basic"
+)
+
+# Known failure markers in llamafirewall/HuggingFace errors. Checked in order,
+# so a message that mentions both an auth and a setup problem counts as auth.
+_ERR_MARKERS: tuple[tuple[str, str], ...] = (
+    ("gated repo", "auth"),
+    ("403", "auth"),
+    ("HfFolder", "setup"),
+    ("manual model setup", "setup"),
+)
+
+
+def _classify_error(error_str: str) -> str | None:
+    """Classify an error message as "auth", "setup", or None if unrecognised."""
+    for marker, kind in _ERR_MARKERS:
+        if marker in error_str:
+            return kind
+    return None
+
 
 _llamafirewall_module: Any = None
 _import_error: str | None = None
 
+# llamafirewall names resolved once by _get_llamafirewall() so scans skip module lookups
+_LLAMAFIREWALL: Any = None
+_ROLE: Any = None
+_SCAN_DECISION: Any = None
+_SCANNER_TYPE: Any = None
+_TOOL_MESSAGE: Any = None
+_USER_MESSAGE: Any = None
+# ScanDecision member -> str(member), built once instead of per alert
+_DECISION_STR: dict[Any, str] = {}
+
+# Process-wide provider state. get_provider() builds a new provider for every
+# check, so anything expensive is shared here rather than kept per instance.
+# Set once the full scanner set failed with an auth/setup error in auto mode
+_use_fallback = False
+# full scanners -> scanner list, built once llamafirewall is imported
+_scanners: dict[bool, list[Any]] = {}
+# (tool_output, full scanners) -> LlamaFirewall; construction loads models
+_firewalls: dict[tuple[bool, bool], Any] = {}
+_firewalls_lock = threading.Lock()
+# LRU of scan outcomes: (digest, content_type, full scanners) -> (explanation, decision),
+# or None if allowed. Only digests are kept, never the content itself.
+_results: OrderedDict[tuple[bytes, str, bool], tuple[str, str] | None] = OrderedDict()
+_results_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _suppress_output_fds() -> Iterator[None]:
+    """Point file descriptors 1 and 2, and sys.stdout/stderr, at os.devnull.
+
+    Unlike contextlib.redirect_stdout/stderr alone, this also silences output
+    that C extensions (tokenizers, safetensors loaders) write straight to the
+    fds. The Python-level streams are redirected too, since sys.stdout may not
+    be backed by fd 1 (an embedding host or a test capture).
+    """
+    try:
+        saved_fds = (os.dup(1), os.dup(2))
+    except OSError:
+        # stdout/stderr already closed, nothing to suppress
+        yield
+        return
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+        with (
+            open(os.devnull, "w") as sink,
+            contextlib.redirect_stdout(sink),
+            contextlib.redirect_stderr(sink),
+        ):
+            yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved_fds[0], 1)
+        os.dup2(saved_fds[1], 2)
+        for fd in (*saved_fds, devnull):
+            os.close(fd)
+
+
+def _configure_torch_for_inference() -> None:
+    """Limit torch to one thread and disable autograd; the provider only scans."""
+    try:
+        import torch
+    except ImportError:
+        return
+
+    torch.set_num_threads(1)
+    torch.autograd.set_grad_enabled(False)
+
+
+def preload(scanner_mode: str) -> None:
+    """Import llamafirewall and its torch/transformers stack ahead of the first check.
+
+    Meant for long-lived processes (--check-stream) whose scanners include the
+    Prompt Guard model, before they start answering requests; basic mode skips
+    it. Runs on the calling thread, because the import swaps fds 1/2 and the
+    warning filters for the whole process, which is only safe while nothing
+    else writes. An import failure is cached and reported by the first check.
+
+    Args:
+        scanner_mode: Configured scanner mode
+    """
+    if scanner_mode.lower() == "basic":
+        return
+    with contextlib.suppress(ImportError):
+        _get_llamafirewall()
+
 
 def _get_llamafirewall() -> Any:
     """Lazy import of llamafirewall module with stderr suppression."""
     global _llamafirewall_module, _import_error
+    global _LLAMAFIREWALL, _ROLE, _SCAN_DECISION, _SCANNER_TYPE, _TOOL_MESSAGE, _USER_MESSAGE
+    global _DECISION_STR
 
     if _llamafirewall_module is not None:
         return _llamafirewall_module
@@ -41,61 +212,60 @@ def _get_llamafirewall() -> Any:
         raise ImportError(_import_error)
 
     try:
-        with (
-            contextlib.redirect_stderr(io.StringIO()),
-            contextlib.redirect_stdout(io.StringIO()),
-            warnings.catch_warnings(),
-        ):
+        with _suppress_output_fds(), warnings.catch_warnings():
             warnings.simplefilter("ignore")
             import llamafirewall
 
+            _configure_torch_for_inference()
+            _LLAMAFIREWALL = llamafirewall.LlamaFirewall
+            _ROLE = llamafirewall.Role
+            _SCAN_DECISION = llamafirewall.ScanDecision
+            _SCANNER_TYPE = llamafirewall.ScannerType
+            _TOOL_MESSAGE = llamafirewall.ToolMessage
+            _USER_MESSAGE = llamafirewall.UserMessage
+            _DECISION_STR = {m: sys.intern(str(m)) for m in llamafirewall.ScanDecision}
             _llamafirewall_module = llamafirewall
             return llamafirewall
     except Exception as e:
         error_str = str(e)
-        if "HfFolder" in error_str:
-            setup_url = (
-                "https://github.com/meta-llama/PurpleLlama/tree/main/"
-                "LlamaFirewall#manual-setup"
-            )
-            _import_error = (
-                "LlamaFirewall requires manual model setup. "
-                "The Prompt Guard model must be downloaded before use. "
-                f"See: {setup_url} - "
-                "Or switch to NeMoGuardrails: CONTEXT_PROTECTOR_PROVIDER=NeMoGuardrails"
-            )
-        else:
-            _import_error = error_str
+        is_setup = _classify_error(error_str) == "setup"
+        _import_error = _IMPORT_SETUP_ERROR if is_setup else error_str
         raise ImportError(_import_error) from e
 
 
 class LlamaFirewallProvider(GuardrailProvider):
     """LlamaFirewall guardrail provider."""
 
-    def __init__(self, mode: str | None = None) -> None:
-        if mode is not None:
-            self._scanner_mode = mode.lower()
-        else:
+    __slots__ = ("_scanner_mode", "_warmup")
+
+    def __init__(self, mode: str | None = None, warmup: bool | None = None) -> None:
+        if mode is None:
             from context_protector.config import get_config
 
-            config = get_config()
-            self._scanner_mode = config.llama_firewall.scanner_mode.lower()
+            mode = get_config().llama_firewall.scanner_mode
 
-        self._use_fallback = False
-        self._lf_module: Any = None
+        self._scanner_mode = mode.lower()
+        # Read from config by _warmup_enabled() the first time a firewall is built
+        self._warmup = warmup
 
     @property
     def name(self) -> str:
         return "LlamaFirewall"
 
-    def _get_module(self) -> Any:
-        if self._lf_module is None:
-            self._lf_module = _get_llamafirewall()
-        return self._lf_module
+    def _use_full_scanners(self) -> bool:
+        """Whether to run PROMPT_GUARD as well as the no-auth scanners."""
+        if self._scanner_mode == "basic":
+            return False
+        return not (_use_fallback and self._scanner_mode == "auto")
 
     def _get_scanners(self) -> list[Any]:
-        lf = self._get_module()
-        ScannerType = lf.ScannerType
+        use_full = self._use_full_scanners()
+        scanners = _scanners.get(use_full)
+        if scanners is not None:
+            return scanners
+
+        _get_llamafirewall()
+        ScannerType = _SCANNER_TYPE
 
         no_auth = [
             ScannerType.HIDDEN_ASCII,
@@ -104,16 +274,154 @@ class LlamaFirewallProvider(GuardrailProvider):
         ]
         full = [ScannerType.PROMPT_GUARD] + no_auth
 
-        if self._use_fallback or self._scanner_mode == "basic":
-            return no_auth
-        return full
+        scanners = full if use_full else no_auth
+        _scanners[use_full] = scanners
+        return scanners
+
+    def _get_firewall(self, tool_output: bool) -> Any:
+        """Get the process-wide LlamaFirewall for a role, building it on first use.
+
+        Args:
+            tool_output: True for the TOOL role, False for the USER role
+
+        Returns:
+            LlamaFirewall instance configured with the current scanners
+        """
+        key = (tool_output, self._use_full_scanners())
+        with _firewalls_lock:
+            lf = _firewalls.get(key)
+            if lf is None:
+                role = _ROLE.TOOL if tool_output else _ROLE.USER
+                lf = _LLAMAFIREWALL(scanners={role: self._get_scanners()})
+                if self._warmup_enabled():
+                    self._warm_up(lf, tool_output)
+                _firewalls[key] = lf
+            return lf
+
+    def _warmup_enabled(self) -> bool:
+        """Whether new firewalls get a warm-up scan, from config unless given."""
+        if self._warmup is None:
+            from context_protector.config import get_config
+
+            self._warmup = get_config().llama_firewall.warmup
+        return self._warmup
+
+    @staticmethod
+    def _warm_up(lf: Any, tool_output: bool) -> None:
+        """Run a throwaway scan so model loading happens before the first real check.
+
+        Failures are only logged; the real scan will surface them.
+        """
+        message_cls = _TOOL_MESSAGE if tool_output else _USER_MESSAGE
+        try:
+            lf.scan(message_cls(content="warmup"))
+        except Exception as e:
+            logger.debug("LlamaFirewall warm-up scan failed: %s", e)
+
+    @staticmethod
+    def _lookup_result(key: tuple[bytes, str, bool]) -> tuple[bool, tuple[str, str] | None]:
+        """Look up a cached scan outcome.
+
+        Args:
+            key: (content digest, content_type, full scanners)
+
+        Returns:
+            (hit, outcome) where outcome is (explanation, decision) or None if allowed
+        """
+        with _results_lock:
+            if key not in _results:
+                return False, None
+            _results.move_to_end(key)
+            return True, _results[key]
+
+    @staticmethod
+    def _store_result(key: tuple[bytes, str, bool], outcome: tuple[str, str] | None) -> None:
+        with _results_lock:
+            _results[key] = outcome
+            _results.move_to_end(key)
+            if len(_results) > _RESULT_CACHE_SIZE:
+                _results.popitem(last=False)
+
+    @staticmethod
+    def _build_alert(content: ContentToCheck, explanation: str, decision: str) -> GuardrailAlert:
+        return GuardrailAlert(
+            explanation=explanation,
+            data={
+                "decision": decision,
+                "content_type": _CONTENT_TYPES.get(content.content_type, content.content_type),
+                "tool_name": content.tool_name,
+            },
+        )
+
+    @staticmethod
+    def _enable_fallback() -> None:
+        """Switch auto-mode providers in this process to the no-auth scanners."""
+        global _use_fallback
+        _use_fallback = True
+
+    def _cache_key(self, content: ContentToCheck) -> tuple[bytes, str, bool] | None:
+        """Get the result-cache key for content, or None if it needs no scan.
+
+        Args:
+            content: The content to check
+
+        Returns:
+            (content digest, content_type, full scanners), or None for trivially
+            safe content
+        """
+        text = content.content
+        # Nothing a scanner could flag: skip loading and running the models
+        if not text or text.isspace():
+            return None
+        if (
+            content.content_type == "tool_input"
+            and len(text) < _TRIVIAL_INPUT_MAX_LEN
+            and text.isascii()
+            and text.isalnum()
+        ):
+            return None
+
+        digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        content_type = _CONTENT_TYPES.get(content.content_type, content.content_type)
+        return (digest, content_type, self._use_full_scanners())
+
+    def _record_result(
+        self, content: ContentToCheck, cache_key: tuple[bytes, str, bool], result: Any
+    ) -> GuardrailAlert | None:
+        """Cache a ScanResult and convert it to an alert.
+
+        Args:
+            content: The content that was scanned
+            cache_key: Result-cache key for the content
+            result: ScanResult returned by LlamaFirewall
+
+        Returns:
+            GuardrailAlert unless the decision was ALLOW
+        """
+        if result.decision == _SCAN_DECISION.ALLOW:
+            self._store_result(cache_key, None)
+            return None
+
+        reason = getattr(result, "reason", None) or "Guardrail triggered"
+        explanation = reason.partition("\n")[0] if reason else "Security threat detected"
+        decision = _DECISION_STR.get(result.decision) or str(result.decision)
+
+        self._store_result(cache_key, (explanation, decision))
+        return self._build_alert(content, explanation, decision)
 
     def check_content(self, content: ContentToCheck) -> GuardrailAlert | None:
+        cache_key = self._cache_key(content)
+        if cache_key is None:
+            return None
+        hit, outcome = self._lookup_result(cache_key)
+        if hit:
+            return None if outcome is None else self._build_alert(content, *outcome)
+
         try:
-            lf_mod = self._get_module()
+            _get_llamafirewall()
         except ImportError as e:
             error_str = str(e)
-            if "manual model setup" in error_str or "HfFolder" in error_str:
+            if _classify_error(error_str) == "setup":
                 explanation = error_str
             else:
                 explanation = f"LlamaFirewall not available: {e}"
@@ -122,64 +430,27 @@ class LlamaFirewallProvider(GuardrailProvider):
                 data={"error": error_str},
             )
 
-        LlamaFirewall = lf_mod.LlamaFirewall
-        Role = lf_mod.Role
-        ScanDecision = lf_mod.ScanDecision
-        ToolMessage = lf_mod.ToolMessage
-        UserMessage = lf_mod.UserMessage
-
-        scanners = self._get_scanners()
-
         try:
-            if content.content_type == "tool_output":
-                lf = LlamaFirewall(scanners={Role.TOOL: scanners})
-                message = ToolMessage(content=content.content)
+            tool_output = content.content_type == "tool_output"
+            lf = self._get_firewall(tool_output)
+            if tool_output:
+                message = _TOOL_MESSAGE(content=content.content)
             else:
-                lf = LlamaFirewall(scanners={Role.USER: scanners})
-                message = UserMessage(content=content.content)
-
-            result = lf.scan(message)
-
-            if result.decision == ScanDecision.ALLOW:
-                return None
+                message = _USER_MESSAGE(content=content.content)
 
-            reason = getattr(result, "reason", None) or "Guardrail triggered"
-            explanation = reason.split("\n")[0] if reason else "Security threat detected"
-
-            return GuardrailAlert(
-                explanation=explanation,
-                data={
-                    "decision": str(result.decision),
-                    "content_type": content.content_type,
-                    "tool_name": content.tool_name,
-                },
-            )
+            return self._record_result(content, cache_key, lf.scan(message))
 
         except Exception as e:
             error_str = str(e)
-
-            if "gated repo" in error_str or "403" in error_str:
-                if not self._use_fallback and self._scanner_mode == "auto":
-                    self._use_fallback = True
-                    return self.check_content(content)
-                else:
-                    explanation = (
-                        "LlamaFirewall PROMPT_GUARD requires authentication. "
-                        "Set CONTEXT_PROTECTOR_SCANNER_MODE=basic to use without auth."
-                    )
-            elif "HfFolder" in error_str:
-                setup_url = (
-                    "https://github.com/meta-llama/PurpleLlama/tree/main/"
-                    "LlamaFirewall#manual-setup"
-                )
-                if not self._use_fallback and self._scanner_mode == "auto":
-                    self._use_fallback = True
-                    return self.check_content(content)
-                explanation = (
-                    "LlamaFirewall requires manual model setup. "
-                    f"See: {setup_url} - "
-                    "Or set CONTEXT_PROTECTOR_SCANNER_MODE=basic"
-                )
+            kind = _classify_error(error_str)
+
+            if kind is not None and self._scanner_mode == "auto" and not _use_fallback:
+                self._enable_fallback()
+                return self.check_content(content)
+            if kind == "auth":
+                explanation = _AUTH_EXPLANATION
+            elif kind == "setup":
+                explanation = _SETUP_EXPLANATION
             else:
                 explanation = f"LlamaFirewall error: {error_str}"
 
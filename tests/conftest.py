@@ -0,0 +1,23 @@
+"""Shared pytest fixtures."""
+
+from collections.abc import Iterator
+
+import pytest
+
+from context_protector.config import Config, reset_config, set_config_path
+
+
+@pytest.fixture(autouse=True)
+def _isolate_config() -> Iterator[None]:
+    """Start and finish every test without a config path override or cached config."""
+    set_config_path(None)
+    reset_config()
+    yield
+    set_config_path(None)
+    reset_config()
+
+
+@pytest.fixture
+def default_config() -> Config:
+    """Provide a fresh default Config for tests that mutate it."""
+    return Config()
@@ -146,6 +146,13 @@ class TestFormatCategories:
         result = format_categories(["o14"])
         assert "O14: Illegal Activities" in result
 
+    def test_format_preserves_order_across_calls(self) -> None:
+        """Test repeated (cached) calls keep the input order."""
+        first = format_categories(["O14", "o12"])
+        second = format_categories(["o14", "O12"])
+        assert first == second == "O14: Illegal Activities, O12: Fraud/Deception"
+        assert format_categories(["O12", "O14"]) == "O12: Fraud/Deception, O14: Illegal Activities"
+
 
 class TestSafetyCategories:
     """Tests for safety categories constant."""
@@ -1,20 +1,25 @@
 """Tests for the config module."""
 
 import os
-import tempfile
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
+import yaml
 
+from context_protector import config as config_module
 from context_protector.config import (
+    DEFAULT_CONFIG_TEMPLATE,
     Config,
     GCPModelArmorConfig,
     LlamaFirewallConfig,
     NeMoGuardrailsConfig,
     _apply_env_overrides,
+    _fast_parse_config,
+    _FastParseBail,
     _load_config_from_file,
     _merge_dict_into_dataclass,
+    _parse_yaml_bytes,
     get_config,
     get_config_path,
     init_config,
@@ -33,6 +38,7 @@ class TestDataclasses:
         """Test LlamaFirewallConfig default values."""
         config = LlamaFirewallConfig()
         assert config.scanner_mode == "basic"
+        assert config.warmup is False
 
     def test_nemo_guardrails_config_defaults(self) -> None:
         """Test NeMoGuardrailsConfig default values."""
@@ -66,8 +72,6 @@ class TestGetConfigPath:
 
     def test_default_path(self) -> None:
         """Test default config path uses ~/.config."""
-        # Reset any override from previous tests
-        set_config_path(None)
         with patch.dict(os.environ, {}, clear=True):
             os.environ.pop("XDG_CONFIG_HOME", None)
             path = get_config_path()
@@ -76,46 +80,48 @@ class TestGetConfigPath:
 
     def test_xdg_config_home(self) -> None:
         """Test config path respects XDG_CONFIG_HOME."""
-        set_config_path(None)
         with patch.dict(os.environ, {"XDG_CONFIG_HOME": "/custom/config"}):
             path = get_config_path()
             expected = Path("/custom/config/context-protector/config.yaml")
             assert path == expected
 
+    def test_env_change_without_reset(self) -> None:
+        """Test the memoized path follows environment changes without a reset."""
+        with patch.dict(os.environ, {"XDG_CONFIG_HOME": "/first"}):
+            assert get_config_path() == Path("/first/context-protector/config.yaml")
+        with patch.dict(os.environ, {"XDG_CONFIG_HOME": "/second"}):
+            assert get_config_path() == Path("/second/context-protector/config.yaml")
+
     def test_set_config_path_override(self) -> None:
         """Test set_config_path overrides default path."""
         custom_path = Path("/custom/path/config.yaml")
         set_config_path(custom_path)
-        try:
-            path = get_config_path()
-            assert path == custom_path
-        finally:
-            set_config_path(None)
+        path = get_config_path()
+        assert path == custom_path
 
 
 class TestMergeDictIntoDataclass:
     """Test _merge_dict_into_dataclass function."""
 
-    def test_merge_valid_keys(self) -> None:
+    def test_merge_valid_keys(self, default_config: Config) -> None:
         """Test merging valid keys into dataclass."""
-        config = Config()
-        _merge_dict_into_dataclass(config, {"provider": "NeMoGuardrails", "response_mode": "block"})
-        assert config.provider == "NeMoGuardrails"
-        assert config.response_mode == "block"
+        _merge_dict_into_dataclass(
+            default_config, {"provider": "NeMoGuardrails", "response_mode": "block"}
+        )
+        assert default_config.provider == "NeMoGuardrails"
+        assert default_config.response_mode == "block"
 
-    def test_merge_ignores_unknown_keys(self) -> None:
+    def test_merge_ignores_unknown_keys(self, default_config: Config) -> None:
         """Test merging ignores unknown keys."""
-        config = Config()
-        _merge_dict_into_dataclass(config, {"unknown_key": "value", "provider": "Mock"})
-        assert config.provider == "Mock"
-        assert not hasattr(config, "unknown_key")
+        _merge_dict_into_dataclass(default_config, {"unknown_key": "value", "provider": "Mock"})
+        assert default_config.provider == "Mock"
+        assert not hasattr(default_config, "unknown_key")
 
-    def test_merge_ignores_none_values(self) -> None:
+    def test_merge_ignores_none_values(self, default_config: Config) -> None:
         """Test merging ignores None values."""
-        config = Config()
-        config.provider = "existing"
-        _merge_dict_into_dataclass(config, {"provider": None})
-        assert config.provider == "existing"
+        default_config.provider = "existing"
+        _merge_dict_into_dataclass(default_config, {"provider": None})
+        assert default_config.provider == "existing"
 
 
 class TestLoadConfigFromFile:
@@ -127,277 +133,393 @@ class TestLoadConfigFromFile:
         assert result == {}
 
     def test_load_valid_yaml(self) -> None:
-        """Test loading valid YAML file."""
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
-            f.write("provider: NeMoGuardrails\nresponse_mode: block\n")
-            f.flush()
-            try:
-                result = _load_config_from_file(Path(f.name))
-                assert result == {"provider": "NeMoGuardrails", "response_mode": "block"}
-            finally:
-                os.unlink(f.name)
+        """Test parsing valid YAML."""
+        result = _parse_yaml_bytes(b"provider: NeMoGuardrails\nresponse_mode: block\n")
+        assert result == {"provider": "NeMoGuardrails", "response_mode": "block"}
 
     def test_load_invalid_yaml(self) -> None:
-        """Test loading invalid YAML returns empty dict."""
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
-            f.write("invalid: yaml: syntax:\n  - broken")
-            f.flush()
-            try:
-                result = _load_config_from_file(Path(f.name))
-                assert result == {}
-            finally:
-                os.unlink(f.name)
+        """Test parsing invalid YAML returns empty dict."""
+        assert _parse_yaml_bytes(b"invalid: yaml: syntax:\n  - broken") == {}
 
     def test_load_non_dict_yaml(self) -> None:
-        """Test loading non-dict YAML returns empty dict."""
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".yaml", delete=False) as f:
-            f.write("- item1\n- item2\n")
-            f.flush()
-            try:
-                result = _load_config_from_file(Path(f.name))
-                assert result == {}
-            finally:
-                os.unlink(f.name)
+        """Test parsing non-dict YAML returns empty dict."""
+        assert _parse_yaml_bytes(b"- item1\n- item2\n") == {}
+
+
+class TestConfigFileCache:
+    """Test the parsed-file cache behind _load_config_from_file."""
+
+    def test_returns_independent_copies(self, tmp_path: Path) -> None:
+        """Test callers cannot mutate the cached data."""
+        path = tmp_path / "config.yaml"
+        path.write_text("provider: NeMoGuardrails\nnemo_guardrails:\n  mode: local\n")
+
+        first = _load_config_from_file(path)
+        first["nemo_guardrails"]["mode"] = "changed"
+
+        assert _load_config_from_file(path)["nemo_guardrails"]["mode"] == "local"
+
+    def test_rereads_changed_file(self, tmp_path: Path) -> None:
+        """Test an edited file is parsed again."""
+        path = tmp_path / "config.yaml"
+        path.write_text("provider: NeMoGuardrails\n")
+        assert _load_config_from_file(path) == {"provider": "NeMoGuardrails"}
+
+        path.write_text("provider: LlamaFirewall\nresponse_mode: block\n")
+        assert _load_config_from_file(path) == {
+            "provider": "LlamaFirewall",
+            "response_mode": "block",
+        }
+
+    def test_reset_config_clears_cache(self, tmp_path: Path) -> None:
+        """Test reset_config() forces a re-read even if size and mtime match."""
+        path = tmp_path / "config.yaml"
+        path.write_text("response_mode: warn \n")
+        st = path.stat()
+        assert _load_config_from_file(path) == {"response_mode": "warn"}
+
+        path.write_text("response_mode: block\n")
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        reset_config()
+
+        assert _load_config_from_file(path) == {"response_mode": "block"}
+
+
+class TestFastParseConfig:
+    """Test _fast_parse_config function."""
+
+    def test_default_template_matches_yaml(self) -> None:
+        """Test the default template parses the same as with PyYAML."""
+        assert _fast_parse_config(DEFAULT_CONFIG_TEMPLATE) == yaml.safe_load(
+            DEFAULT_CONFIG_TEMPLATE
+        )
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "enabled: false\nprovider: 'NeMoGuardrails'  # comment\n",
+            "log_file: null\nlog_level: \"DEBUG\"\ncount: -12\n",
+            "gcp_model_armor:\n    project_id: my-project\n    location: ~\n",
+            "enabled: yes\nllama_firewall:\n# comment\n\nprovider: Mock\n",
+        ],
+    )
+    def test_scalars_match_yaml(self, text: str) -> None:
+        """Test supported scalars resolve the same as with PyYAML."""
+        assert _fast_parse_config(text) == yaml.safe_load(text)
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "- item1\n- item2\n",
+            "invalid: yaml: syntax:\n",
+            "threshold: 1.5\n",
+            "provider: [a, b]\n",
+            "section:\n  nested:\n    deeper: 1\n",
+            "provider: 'it''s'\n",
+        ],
+    )
+    def test_unsupported_yaml_bails(self, text: str) -> None:
+        """Test YAML outside the supported subset raises _FastParseBail."""
+        with pytest.raises(_FastParseBail):
+            _fast_parse_config(text)
+
+    def test_load_falls_back_to_yaml(self, tmp_path: Path) -> None:
+        """Test files outside the subset are still loaded via PyYAML."""
+        path = tmp_path / "config.yaml"
+        path.write_text("provider: NeMoGuardrails\nnemo_guardrails: {mode: local}\n")
+        result = _load_config_from_file(path)
+        assert result == {"provider": "NeMoGuardrails", "nemo_guardrails": {"mode": "local"}}
 
 
 class TestApplyEnvOverrides:
     """Test _apply_env_overrides function."""
 
-    def test_provider_override(self) -> None:
+    def test_provider_override(
+        self, default_config: Config, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Test CONTEXT_PROTECTOR_PROVIDER override."""
-        config = Config()
-        with patch.dict(os.environ, {"CONTEXT_PROTECTOR_PROVIDER": "NeMoGuardrails"}):
-            _apply_env_overrides(config)
-            assert config.provider == "NeMoGuardrails"
+        monkeypatch.setenv("CONTEXT_PROTECTOR_PROVIDER", "NeMoGuardrails")
+        _apply_env_overrides(default_config)
+        assert default_config.provider == "NeMoGuardrails"
 
-    def test_response_mode_override(self) -> None:
+    def test_response_mode_override(
+        self, default_config: Config, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Test CONTEXT_PROTECTOR_RESPONSE_MODE override."""
-        config = Config()
-        with patch.dict(os.environ, {"CONTEXT_PROTECTOR_RESPONSE_MODE": "BLOCK"}):
-            _apply_env_overrides(config)
-            assert config.response_mode == "block"
+        monkeypatch.setenv("CONTEXT_PROTECTOR_RESPONSE_MODE", "BLOCK")
+        _apply_env_overrides(default_config)
+        assert default_config.response_mode == "block"
 
-    def test_log_level_override(self) -> None:
+    def test_log_level_override(
+        self, default_config: Config, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Test CONTEXT_PROTECTOR_LOG_LEVEL override."""
-        config = Config()
-        with patch.dict(os.environ, {"CONTEXT_PROTECTOR_LOG_LEVEL": "debug"}):
-            _apply_env_overrides(config)
-            assert config.log_level == "DEBUG"
+        monkeypatch.setenv("CONTEXT_PROTECTOR_LOG_LEVEL", "debug")
+        _apply_env_overrides(default_config)
+        assert default_config.log_level == "DEBUG"
 
-    def test_log_file_override(self) -> None:
+    def test_log_file_override(
+        self, default_config: Config, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Test CONTEXT_PROTECTOR_LOG_FILE override."""
-        config = Config()
-        with patch.dict(os.environ, {"CONTEXT_PROTECTOR_LOG_FILE": "/var/log/protector.log"}):
-            _apply_env_overrides(config)
-            assert config.log_file == "/var/log/protector.log"
+        monkeypatch.setenv("CONTEXT_PROTECTOR_LOG_FILE", "/var/log/protector.log")
+        _apply_env_overrides(default_config)
+        assert default_config.log_file == "/var/log/protector.log"
 
-    def test_scanner_mode_override(self) -> None:
+    def test_scanner_mode_override(
+        self, default_config: Config, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Test CONTEXT_PROTECTOR_SCANNER_MODE override."""
-        config = Config()
-        with patch.dict(os.environ, {"CONTEXT_PROTECTOR_SCANNER_MODE": "FULL"}):
-            _apply_env_overrides(config)
-            assert config.llama_firewall.scanner_mode == "full"
-
-    def test_nemo_mode_override(self) -> None:
+        monkeypatch.setenv("CONTEXT_PROTECTOR_SCANNER_MODE", "FULL")
+        _apply_env_overrides(default_config)
+        assert default_config.llama_firewall.scanner_mode == "full"
+
+    def test_llama_warmup_override(
+        self, default_config: Config, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test CONTEXT_PROTECTOR_LLAMA_WARMUP override."""
+        monkeypatch.setenv("CONTEXT_PROTECTOR_LLAMA_WARMUP", "true")
+        _apply_env_overrides(default_config)
+        assert default_config.llama_firewall.warmup is True
+
+    def test_nemo_mode_override(
+        self, default_config: Config, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Test CONTEXT_PROTECTOR_NEMO_MODE override."""
-        config = Config()
-        with patch.dict(os.environ, {"CONTEXT_PROTECTOR_NEMO_MODE": "INJECTION"}):
-            _apply_env_overrides(config)
-            assert config.nemo_guardrails.mode == "injection"
+        monkeypatch.setenv("CONTEXT_PROTECTOR_NEMO_MODE", "INJECTION")
+        _apply_env_overrides(default_config)
+        assert default_config.nemo_guardrails.mode == "injection"
 
-    def test_nemo_ollama_model_override(self) -> None:
+    def test_nemo_ollama_model_override(
+        self, default_config: Config, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Test CONTEXT_PROTECTOR_OLLAMA_MODEL override."""
-        config = Config()
-        with patch.dict(os.environ, {"CONTEXT_PROTECTOR_OLLAMA_MODEL": "phi3"}):
-            _apply_env_overrides(config)
-            assert config.nemo_guardrails.ollama_model == "phi3"
+        monkeypatch.setenv("CONTEXT_PROTECTOR_OLLAMA_MODEL", "phi3")
+        _apply_env_overrides(default_config)
+        assert default_config.nemo_guardrails.ollama_model == "phi3"
 
-    def test_nemo_ollama_base_url_override(self) -> None:
+    def test_nemo_ollama_base_url_override(
+        self, default_config: Config, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Test CONTEXT_PROTECTOR_OLLAMA_BASE_URL override."""
-        config = Config()
-        with patch.dict(
-            os.environ, {"CONTEXT_PROTECTOR_OLLAMA_BASE_URL": "http://remote:11434"}
-        ):
-            _apply_env_overrides(config)
-            assert config.nemo_guardrails.ollama_base_url == "http://remote:11434"
+        monkeypatch.setenv("CONTEXT_PROTECTOR_OLLAMA_BASE_URL", "http://remote:11434")
+        _apply_env_overrides(default_config)
+        assert default_config.nemo_guardrails.ollama_base_url == "http://remote:11434"
 
-    def test_gcp_project_id_override(self) -> None:
+    def test_gcp_project_id_override(
+        self, default_config: Config, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Test CONTEXT_PROTECTOR_GCP_PROJECT_ID override."""
-        config = Config()
-        with patch.dict(os.environ, {"CONTEXT_PROTECTOR_GCP_PROJECT_ID": "my-project"}):
-            _apply_env_overrides(config)
-            assert config.gcp_model_armor.project_id == "my-project"
+        monkeypatch.setenv("CONTEXT_PROTECTOR_GCP_PROJECT_ID", "my-project")
+        _apply_env_overrides(default_config)
+        assert default_config.gcp_model_armor.project_id == "my-project"
 
-    def test_gcp_location_override(self) -> None:
+    def test_gcp_location_override(
+        self, default_config: Config, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Test CONTEXT_PROTECTOR_GCP_LOCATION override."""
-        config = Config()
-        with patch.dict(os.environ, {"CONTEXT_PROTECTOR_GCP_LOCATION": "us-central1"}):
-            _apply_env_overrides(config)
-            assert config.gcp_model_armor.location == "us-central1"
+        monkeypatch.setenv("CONTEXT_PROTECTOR_GCP_LOCATION", "us-central1")
+        _apply_env_overrides(default_config)
+        assert default_config.gcp_model_armor.location == "us-central1"
 
-    def test_gcp_template_id_override(self) -> None:
+    def test_gcp_template_id_override(
+        self, default_config: Config, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
         """Test CONTEXT_PROTECTOR_GCP_TEMPLATE_ID override."""
-        config = Config()
-        with patch.dict(os.environ, {"CONTEXT_PROTECTOR_GCP_TEMPLATE_ID": "my-template"}):
-            _apply_env_overrides(config)
-            assert config.gcp_model_armor.template_id == "my-template"
+        monkeypatch.setenv("CONTEXT_PROTECTOR_GCP_TEMPLATE_ID", "my-template")
+        _apply_env_overrides(default_config)
+        assert default_config.gcp_model_armor.template_id == "my-template"
 
 
 class TestLoadConfig:
     """Test load_config function."""
 
-    def test_load_config_no_file(self) -> None:
+    def test_load_config_no_file(self, tmp_path: Path) -> None:
         """Test loading config when no file exists."""
-        set_config_path(None)
-        with (
-            tempfile.TemporaryDirectory() as tmpdir,
-            patch.dict(os.environ, {"XDG_CONFIG_HOME": tmpdir}, clear=True),
-        ):
+        with patch.dict(os.environ, {"XDG_CONFIG_HOME": str(tmp_path)}, clear=True):
             config = load_config()
             # Should have defaults
             assert config.provider == "LlamaFirewall"
             assert config.llama_firewall.scanner_mode == "basic"
 
-    def test_load_config_with_file(self) -> None:
+    def test_load_config_with_file(self, tmp_path: Path) -> None:
         """Test loading config from file."""
-        set_config_path(None)
-        with tempfile.TemporaryDirectory() as tmpdir:
-            config_dir = Path(tmpdir) / "context-protector"
-            config_dir.mkdir(parents=True)
-            config_file = config_dir / "config.yaml"
-            config_file.write_text("provider: NeMoGuardrails\nresponse_mode: block\n")
-
-            with patch.dict(os.environ, {"XDG_CONFIG_HOME": tmpdir}, clear=True):
-                config = load_config()
-                assert config.provider == "NeMoGuardrails"
-                assert config.response_mode == "block"
-
-    def test_load_config_env_overrides_file(self) -> None:
+        config_dir = tmp_path / "context-protector"
+        config_dir.mkdir(parents=True)
+        config_file = config_dir / "config.yaml"
+        config_file.write_text("provider: NeMoGuardrails\nresponse_mode: block\n")
+
+        with patch.dict(os.environ, {"XDG_CONFIG_HOME": str(tmp_path)}, clear=True):
+            config = load_config()
+            assert config.provider == "NeMoGuardrails"
+            assert config.response_mode == "block"
+
+    def test_load_config_env_overrides_file(self, tmp_path: Path) -> None:
         """Test environment variables override file values."""
-        set_config_path(None)
-        with tempfile.TemporaryDirectory() as tmpdir:
-            config_dir = Path(tmpdir) / "context-protector"
-            config_dir.mkdir(parents=True)
-            config_file = config_dir / "config.yaml"
-            config_file.write_text("provider: NeMoGuardrails\n")
-
-            env = {
-                "XDG_CONFIG_HOME": tmpdir,
-                "CONTEXT_PROTECTOR_PROVIDER": "LlamaFirewall",
-            }
-            with patch.dict(os.environ, env, clear=True):
-                config = load_config()
-                # Env var should override file
-                assert config.provider == "LlamaFirewall"
-
-    def test_load_config_nested_settings(self) -> None:
-        """Test loading nested provider settings from file."""
-        set_config_path(None)
-        with tempfile.TemporaryDirectory() as tmpdir:
-            config_dir = Path(tmpdir) / "context-protector"
-            config_dir.mkdir(parents=True)
-            config_file = config_dir / "config.yaml"
-            config_file.write_text(
-                "llama_firewall:\n  scanner_mode: full\nnemo_guardrails:\n  mode: local\n"
-            )
+        config_dir = tmp_path / "context-protector"
+        config_dir.mkdir(parents=True)
+        config_file = config_dir / "config.yaml"
+        config_file.write_text("provider: NeMoGuardrails\n")
+
+        env = {
+            "XDG_CONFIG_HOME": str(tmp_path),
+            "CONTEXT_PROTECTOR_PROVIDER": "LlamaFirewall",
+        }
+        with patch.dict(os.environ, env, clear=True):
+            config = load_config()
+            # Env var should override file
+            assert config.provider == "LlamaFirewall"
 
-            with patch.dict(os.environ, {"XDG_CONFIG_HOME": tmpdir}, clear=True):
-                config = load_config()
-                assert config.llama_firewall.scanner_mode == "full"
-                assert config.nemo_guardrails.mode == "local"
+    def test_load_config_nested_settings(self, tmp_path: Path) -> None:
+        """Test loading nested provider settings from file."""
+        config_dir = tmp_path / "context-protector"
+        config_dir.mkdir(parents=True)
+        config_file = config_dir / "config.yaml"
+        config_file.write_text(
+            "llama_firewall:\n  scanner_mode: full\nnemo_guardrails:\n  mode: local\n"
+        )
+
+        with patch.dict(os.environ, {"XDG_CONFIG_HOME": str(tmp_path)}, clear=True):
+            config = load_config()
+            assert config.llama_firewall.scanner_mode == "full"
+            assert config.nemo_guardrails.mode == "local"
+
+    def test_load_config_reuses_result_until_inputs_change(self, tmp_path: Path) -> None:
+        """Test load_config is reused until the environment or file changes."""
+        config_dir = tmp_path / "context-protector"
+        config_dir.mkdir(parents=True)
+        config_file = config_dir / "config.yaml"
+        config_file.write_text("provider: NeMoGuardrails\n")
+
+        with patch.dict(os.environ, {"XDG_CONFIG_HOME": str(tmp_path)}, clear=True):
+            first = load_config()
+            assert load_config() == first
+
+            os.environ["CONTEXT_PROTECTOR_RESPONSE_MODE"] = "block"
+            second = load_config()
+            assert second.response_mode == "block"
+
+            config_file.write_text("provider: GCPModelArmor\n")
+            assert load_config().provider == "GCPModelArmor"
+
+    def test_load_config_cache_ignores_unmapped_env(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Only the variables in _ENV_MAP decide whether the cached result is reused."""
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text("provider: NeMoGuardrails\n")
+        set_config_path(config_file)
+        reads: list[Path] = []
+        load_from_file = config_module._load_config_from_file
+        monkeypatch.setattr(
+            config_module,
+            "_load_config_from_file",
+            lambda path: reads.append(path) or load_from_file(path),
+        )
+
+        load_config()
+        monkeypatch.setenv("CONTEXT_PROTECTOR_NEMO_CONFIG_PATH", "/elsewhere")
+        load_config()
+        assert len(reads) == 1
+
+        monkeypatch.setenv("CONTEXT_PROTECTOR_LOG_LEVEL", "debug")
+        assert load_config().log_level == "DEBUG"
+        assert len(reads) == 2
+
+    @pytest.mark.parametrize("with_file", [False, True], ids=["defaults", "loaded"])
+    def test_load_config_returns_independent_copies(self, tmp_path: Path, with_file: bool) -> None:
+        """Mutating a returned config does not leak into later load_config calls."""
+        if with_file:
+            (tmp_path / "config.yaml").write_text("provider: NeMoGuardrails\n")
+        set_config_path(tmp_path / "config.yaml")
+
+        first = load_config()
+        first.provider = "Mock"
+        first.llama_firewall.scanner_mode = "full"
+
+        second = load_config()
+        assert second is not first
+        assert second.provider == ("NeMoGuardrails" if with_file else "LlamaFirewall")
+        assert second.llama_firewall.scanner_mode == "basic"
 
 
 class TestSaveConfig:
     """Test save_config function."""
 
-    def test_save_config_creates_file(self) -> None:
+    def test_save_config_creates_file(self, tmp_path: Path) -> None:
         """Test save_config creates config file."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            path = Path(tmpdir) / "subdir" / "config.yaml"
-            config = Config()
-            config.provider = "NeMoGuardrails"
+        path = tmp_path / "subdir" / "config.yaml"
+        config = Config()
+        config.provider = "NeMoGuardrails"
 
-            save_config(config, path)
+        save_config(config, path)
 
-            assert path.exists()
-            content = path.read_text()
-            assert "provider: NeMoGuardrails" in content
+        assert path.exists()
+        content = path.read_text()
+        assert "provider: NeMoGuardrails" in content
 
-    def test_save_config_default_path(self) -> None:
+    def test_save_config_default_path(self, tmp_path: Path) -> None:
         """Test save_config uses default path."""
-        set_config_path(None)
-        with (
-            tempfile.TemporaryDirectory() as tmpdir,
-            patch.dict(os.environ, {"XDG_CONFIG_HOME": tmpdir}),
-        ):
+        with patch.dict(os.environ, {"XDG_CONFIG_HOME": str(tmp_path)}):
             config = Config()
             save_config(config)
 
-            expected_path = Path(tmpdir) / "context-protector" / "config.yaml"
+            expected_path = tmp_path / "context-protector" / "config.yaml"
             assert expected_path.exists()
 
 
 class TestSaveDefaultConfig:
     """Test save_default_config function."""
 
-    def test_save_default_config_creates_template(self) -> None:
+    def test_save_default_config_creates_template(self, tmp_path: Path) -> None:
         """Test save_default_config creates template with comments."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            path = Path(tmpdir) / "config.yaml"
-            save_default_config(path)
+        path = tmp_path / "config.yaml"
+        save_default_config(path)
 
-            content = path.read_text()
-            assert "# Context Protector Configuration" in content
-            assert "provider: LlamaFirewall" in content
-            assert "scanner_mode: basic" in content
+        content = path.read_text()
+        assert "# Context Protector Configuration" in content
+        assert "provider: LlamaFirewall" in content
+        assert "scanner_mode: basic" in content
 
 
 class TestInitConfig:
     """Test init_config function."""
 
-    def test_init_config_creates_file(self) -> None:
+    def test_init_config_creates_file(self, tmp_path: Path) -> None:
         """Test init_config creates config file."""
-        set_config_path(None)
-        with (
-            tempfile.TemporaryDirectory() as tmpdir,
-            patch.dict(os.environ, {"XDG_CONFIG_HOME": tmpdir}),
-        ):
+        with patch.dict(os.environ, {"XDG_CONFIG_HOME": str(tmp_path)}):
             path = init_config()
 
             assert path.exists()
             assert "config.yaml" in str(path)
 
-    def test_init_config_raises_if_exists(self) -> None:
+    def test_init_config_raises_if_exists(self, tmp_path: Path) -> None:
         """Test init_config raises FileExistsError if file exists."""
-        set_config_path(None)
-        with tempfile.TemporaryDirectory() as tmpdir:
-            config_dir = Path(tmpdir) / "context-protector"
-            config_dir.mkdir(parents=True)
-            config_file = config_dir / "config.yaml"
-            config_file.write_text("existing: config\n")
-
-            with (
-                patch.dict(os.environ, {"XDG_CONFIG_HOME": tmpdir}),
-                pytest.raises(FileExistsError),
-            ):
-                init_config()
-
-    def test_init_config_force_overwrites(self) -> None:
+        config_dir = tmp_path / "context-protector"
+        config_dir.mkdir(parents=True)
+        config_file = config_dir / "config.yaml"
+        config_file.write_text("existing: config\n")
+
+        with (
+            patch.dict(os.environ, {"XDG_CONFIG_HOME": str(tmp_path)}),
+            pytest.raises(FileExistsError),
+        ):
+            init_config()
+
+    def test_init_config_force_overwrites(self, tmp_path: Path) -> None:
         """Test init_config with force=True overwrites existing."""
-        set_config_path(None)
-        with tempfile.TemporaryDirectory() as tmpdir:
-            config_dir = Path(tmpdir) / "context-protector"
-            config_dir.mkdir(parents=True)
-            config_file = config_dir / "config.yaml"
-            config_file.write_text("existing: config\n")
+        config_dir = tmp_path / "context-protector"
+        config_dir.mkdir(parents=True)
+        config_file = config_dir / "config.yaml"
+        config_file.write_text("existing: config\n")
 
-            with patch.dict(os.environ, {"XDG_CONFIG_HOME": tmpdir}):
-                path = init_config(force=True)
+        with patch.dict(os.environ, {"XDG_CONFIG_HOME": str(tmp_path)}):
+            path = init_config(force=True)
 
-                content = path.read_text()
-                # Should have template content, not original
-                assert "# Context Protector Configuration" in content
-                assert "existing: config" not in content
+            content = path.read_text()
+            # Should have template content, not original
+            assert "# Context Protector Configuration" in content
+            assert "existing: config" not in content
 
 
 class TestGetConfigAndReset:
@@ -405,8 +527,6 @@ class TestGetConfigAndReset:
 
     def test_get_config_returns_same_instance(self) -> None:
         """Test get_config returns cached instance."""
-        reset_config()  # Ensure clean state
-
         config1 = get_config()
         config2 = get_config()
 
@@ -414,8 +534,6 @@ class TestGetConfigAndReset:
 
     def test_reset_config_clears_cache(self) -> None:
         """Test reset_config forces reload."""
-        reset_config()  # Ensure clean state
-
         config1 = get_config()
         reset_config()
         config2 = get_config()
@@ -423,21 +541,13 @@ class TestGetConfigAndReset:
         # Different instances
         assert config1 is not config2
 
-    def test_get_config_loads_from_file(self) -> None:
+    def test_get_config_loads_from_file(self, tmp_path: Path) -> None:
         """Test get_config loads from file."""
-        reset_config()
-        set_config_path(None)
+        config_dir = tmp_path / "context-protector"
+        config_dir.mkdir(parents=True)
+        config_file = config_dir / "config.yaml"
+        config_file.write_text("provider: NeMoGuardrails\n")
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            config_dir = Path(tmpdir) / "context-protector"
-            config_dir.mkdir(parents=True)
-            config_file = config_dir / "config.yaml"
-            config_file.write_text("provider: NeMoGuardrails\n")
-
-            with patch.dict(os.environ, {"XDG_CONFIG_HOME": tmpdir}, clear=True):
-                reset_config()
-                config = get_config()
-                assert config.provider == "NeMoGuardrails"
-
-        # Clean up
-        reset_config()
+        with patch.dict(os.environ, {"XDG_CONFIG_HOME": str(tmp_path)}, clear=True):
+            config = get_config()
+            assert config.provider == "NeMoGuardrails"
@@ -1,5 +1,8 @@
 """Tests for guardrail providers."""
 
+import importlib
+import sys
+
 import pytest
 
 from context_protector.guardrail_types import ContentToCheck
@@ -178,3 +181,31 @@ class TestGetAvailableProviderNames:
         names = get_available_provider_names()
 
         assert "LlamaFirewall" in names
+
+
+class TestProvidersPackage:
+    """Tests for the providers package exports."""
+
+    def test_llamafirewall_provider_is_lazy(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test importing the package does not load the LlamaFirewall module."""
+        import context_protector
+
+        package_name = "context_protector.providers"
+        module_name = f"{package_name}.llama_firewall"
+        # Re-import fresh copies; the originals are restored afterwards
+        monkeypatch.setattr(context_protector, "providers", context_protector.providers)
+        monkeypatch.delitem(sys.modules, package_name)
+        monkeypatch.delitem(sys.modules, module_name, raising=False)
+
+        providers = importlib.import_module(package_name)
+        assert module_name not in sys.modules
+
+        assert providers.LlamaFirewallProvider.__name__ == "LlamaFirewallProvider"
+        assert module_name in sys.modules
+
+    def test_unknown_attribute_raises(self) -> None:
+        """Test unknown package attributes raise AttributeError."""
+        import context_protector.providers as providers
+
+        with pytest.raises(AttributeError):
+            _ = providers.NotAProvider  # type: ignore[attr-defined]